@@ -5,36 +5,281 @@ Uploads scraped Pinterest content to Google Drive with proper folder structure.
 
 import os
 import logging
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import random
+import re
+import tarfile
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Iterator, Tuple
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-import pickle
 
 logger = logging.getLogger(__name__)
 
 # Scopes for Google Drive API
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Drive also signals rate limiting as 403 with one of these reasons
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+MAX_BACKOFF_SECONDS = 64
+
+# Folder ID in ".../folders/<id>" or "...?id=<id>" style Drive URLs
+_FOLDER_ID_RE = re.compile(r'(?:/folders/|[?&]id=)([A-Za-z0-9_-]+)')
+
+# Files above this size use a resumable session; smaller ones go up in a single request
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Block size read ahead from disk while a resumable upload is sending; one whole chunk,
+# so the next chunk's read overlaps entirely with the current chunk's PUT
+READ_AHEAD_BLOCK_SIZE = UPLOAD_CHUNK_SIZE
+
+# MIME types for the file kinds the scraper produces; anything else falls back to mimetypes
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.json': 'application/json',
+}
+
+# Small-file bundling: files below SMALL_FILE_SIZE are packed into one archive per topic
+# when there are more than MIN_BUNDLE_FILES of them and they make up most of the topic
+SMALL_FILE_SIZE = 64 * 1024
+MIN_BUNDLE_FILES = 20
+
+# Number of file IDs reserved per files.generateIds call
+ID_BATCH_SIZE = 100
+
+# Refresh tokens proactively when they expire within this window
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Authenticated (credentials, service) pairs shared by uploaders using the same token file
+_SERVICE_CACHE: Dict[str, tuple] = {}
+
+
+def _q_escape(value: str) -> str:
+    """Escape a string for use inside a quoted Drive query literal."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _local_md5(path: Path, buffer_size: int = 1024 * 1024) -> str:
+    """Compute the MD5 hex digest of a file, the checksum Drive reports as md5Checksum."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        while chunk := f.read(buffer_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _matches_remote(file_path: Path, file_size: int, remote: dict) -> bool:
+    """
+    Check whether a local file has the same content as a file in Drive.
+
+    Sizes are compared first so the MD5 is only computed when it can matter.
+    Remote files without a checksum are treated as matching.
+    """
+    remote_size = remote.get('size')
+    if remote_size is not None and int(remote_size) != file_size:
+        return False
+    remote_md5 = remote.get('md5Checksum')
+    if remote_md5 is None:
+        return True
+    return _local_md5(file_path) == remote_md5
+
+
+def _is_retryable(error: HttpError) -> bool:
+    """Check whether a Drive API error is a rate limit or transient failure."""
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status != 403:
+        return False
+    try:
+        reason = json.loads(error.content)['error']['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return False
+    return reason in RATE_LIMIT_REASONS
+
+
+def _build_service(creds):
+    """
+    Build a Drive v3 service from the discovery document bundled with
+    google-api-python-client, skipping both the network fetch and the file cache.
+    """
+    return build('drive', 'v3', credentials=creds, cache_discovery=False, static_discovery=True)
+
+
+def _expires_soon(creds) -> bool:
+    """Check whether credentials expire within TOKEN_REFRESH_MARGIN."""
+    if not creds.expiry:
+        return False
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < TOKEN_REFRESH_MARGIN
+
+
+def _walk_files(root: Path) -> Iterator[Tuple[str, str, int]]:
+    """
+    Recursively yield every regular file below a directory.
+
+    Uses os.scandir so directory entries are classified without an extra
+    stat() per entry.
+
+    Args:
+        root: Directory to walk
+
+    Yields:
+        (path, name, size) tuples
+    """
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.name, entry.stat(follow_symlinks=False).st_size
+
+
+class _ReadAheadFile(io.RawIOBase):
+    """
+    Seekable read-only file that loads the next block from disk in the background.
+
+    While the HTTP client sends one block, the following block is already
+    being read, so disk latency overlaps with network writes on large
+    resumable uploads. Seeks (used by the client when resuming) simply
+    fall back to a synchronous read.
+    """
+
+    def __init__(self, path: Path, block_size: int = READ_AHEAD_BLOCK_SIZE):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._block_size = block_size
+        self._pos = 0
+        self._file_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='drive-read-ahead')
+        self._current = None  # (block index, bytes)
+        self._next = None  # (block index, future)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def _read_block(self, index: int) -> bytes:
+        with self._file_lock:
+            self._file.seek(index * self._block_size)
+            return self._file.read(self._block_size)
+
+    def _block(self, index: int) -> bytes:
+        if self._current is None or self._current[0] != index:
+            if self._next is not None and self._next[0] == index:
+                block = self._next[1].result()
+            else:
+                block = self._read_block(index)
+            self._current = (index, block)
+
+            next_index = index + 1
+            if next_index * self._block_size < self._size:
+                self._next = (next_index, self._executor.submit(self._read_block, next_index))
+            else:
+                self._next = None
+        return self._current[1]
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._size - self._pos
+        size = min(size, max(0, self._size - self._pos))
+
+        # Chunk-aligned reads are served from a single block without copying it again
+        index, start = divmod(self._pos, self._block_size)
+        if size and start + size <= self._block_size:
+            piece = self._block(index)[start:start + size]
+            self._pos += len(piece)
+            return piece
+
+        out = bytearray()
+        while size > 0 and self._pos < self._size:
+            index, start = divmod(self._pos, self._block_size)
+            piece = self._block(index)[start:start + size]
+            if not piece:
+                break
+            out += piece
+            self._pos += len(piece)
+            size -= len(piece)
+        return bytes(out)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._executor.shutdown(wait=True)
+            self._file.close()
+        super().close()
+
 
 class DriveUploader:
     """Handle Google Drive uploads with proper folder structure."""
 
-    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token.pkl'):
+    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token.json',
+                 max_workers: int = 6, bundle_small_files: bool = False):
         """
         Initialize Drive uploader.
 
         Args:
             credentials_path: Path to OAuth 2.0 credentials JSON from Google Cloud Console
-            token_path: Path to store authenticated token
+            token_path: Path to store authenticated token (JSON)
+            max_workers: Number of files uploaded concurrently per category
+            bundle_small_files: Pack small files of a topic into one compressed archive
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.max_workers = max_workers
+        self.bundle_small_files = bundle_small_files
         self.service = None
-        self.folder_cache: Dict[str, str] = {}  # Cache folder IDs
+        self.folder_cache: Dict[Tuple[Optional[str], str], str] = {}  # (parent ID, name) -> folder ID
+        self._creds = None
+        self._tls = threading.local()  # Per-thread Drive services (httplib2 is not thread-safe)
+        self._cache_lock = threading.Lock()
+        self._folder_locks: Dict[Tuple[Optional[str], str], threading.Lock] = {}  # In-flight folder lookups
+        self._folder_locks_mutex = threading.Lock()
+        self._remote_index: Dict[str, Dict[str, dict]] = {}  # folder ID -> name -> Drive metadata
+        self._id_pool: deque = deque()  # Pre-allocated Drive file IDs
+        self._id_pool_lock = threading.Lock()
 
     def authenticate(self) -> bool:
         """
@@ -43,20 +288,27 @@ class DriveUploader:
         Returns:
             True if authentication successful, False otherwise
         """
+        # Reuse a service built earlier in this process for the same token
+        cached = _SERVICE_CACHE.get(self.token_path)
+        if cached and cached[0].valid and not _expires_soon(cached[0]):
+            self._creds, self.service = cached
+            self._tls.service = self.service
+            logger.debug("Reusing cached Google Drive service")
+            return True
+
         creds = None
 
         # Load existing token if available
         if os.path.exists(self.token_path):
             try:
-                with open(self.token_path, 'rb') as token:
-                    creds = pickle.load(token)
+                creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
                 logger.info("Loaded existing credentials from token")
             except Exception as e:
                 logger.warning(f"Could not load token: {e}")
 
-        # If no valid credentials, get new ones
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
+        # If no valid credentials, get new ones (refreshing early if they are about to expire)
+        if not creds or not creds.valid or _expires_soon(creds):
+            if creds and creds.refresh_token and (creds.expired or _expires_soon(creds)):
                 try:
                     creds.refresh(Request())
                     logger.info("Refreshed expired credentials")
@@ -81,21 +333,58 @@ class DriveUploader:
                     return False
 
             # Save credentials for future use
-            with open(self.token_path, 'wb') as token:
-                pickle.dump(creds, token)
+            Path(self.token_path).write_text(creds.to_json(), encoding='utf-8')
 
         try:
-            self.service = build('drive', 'v3', credentials=creds)
+            self._creds = creds
+            self.service = _build_service(creds)
+            self._tls.service = self.service
+            _SERVICE_CACHE[self.token_path] = (creds, self.service)
             logger.info("Google Drive service initialized successfully")
             return True
         except Exception as e:
             logger.error(f"Failed to build Drive service: {e}")
             return False
 
+    def _service(self):
+        """Return a Drive service owned by the calling thread, building it on first use."""
+        service = getattr(self._tls, 'service', None)
+        if service is None:
+            service = _build_service(self._creds)
+            self._tls.service = service
+        return service
+
+    def _execute_with_backoff(self, request, max_tries: int = 6):
+        """
+        Execute a Drive API request, retrying with exponential backoff and jitter.
+
+        Rate-limit responses (429, or 403 with a rate-limit reason) and 5xx
+        errors are retried; anything else is re-raised immediately.
+
+        Args:
+            request: Prepared googleapiclient request
+            max_tries: Total number of attempts before giving up
+
+        Returns:
+            The API response
+        """
+        for attempt in range(max_tries):
+            try:
+                return request.execute()
+            except HttpError as e:
+                if not _is_retryable(e) or attempt == max_tries - 1:
+                    raise
+                wait_time = min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.random()
+                logger.debug(f"Drive request failed (HTTP {e.resp.status}), retrying in {wait_time:.1f}s")
+                time.sleep(wait_time)
+
     def find_or_create_folder(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
         """
         Find existing folder or create new one.
 
+        Concurrent calls for the same folder are serialised so only one of
+        them searches/creates it; the others wait and read the cached ID.
+
         Args:
             folder_name: Name of the folder
             parent_id: Parent folder ID (None for root level in target folder)
@@ -104,85 +393,240 @@ class DriveUploader:
             Folder ID if successful, None otherwise
         """
         # Check cache first
-        cache_key = f"{parent_id}/{folder_name}" if parent_id else f"root/{folder_name}"
-        if cache_key in self.folder_cache:
-            return self.folder_cache[cache_key]
+        cache_key = (parent_id, folder_name)
+        with self._cache_lock:
+            if cache_key in self.folder_cache:
+                return self.folder_cache[cache_key]
 
-        try:
-            # Search for existing folder
-            query = f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}' and trashed=false"
-            if parent_id:
-                query += f" and '{parent_id}' in parents"
-
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
-            folders = results.get('files', [])
-
-            if folders:
-                folder_id = folders[0]['id']
-                logger.debug(f"Found existing folder: {folder_name} ({folder_id})")
-                self.folder_cache[cache_key] = folder_id
+        with self._folder_locks_mutex:
+            folder_lock = self._folder_locks.setdefault(cache_key, threading.Lock())
+
+        with folder_lock:
+            # Another thread may have resolved the folder while we waited
+            with self._cache_lock:
+                if cache_key in self.folder_cache:
+                    return self.folder_cache[cache_key]
+
+            try:
+                # Search for existing folder
+                query = f"mimeType='application/vnd.google-apps.folder' and name='{_q_escape(folder_name)}' and trashed=false"
+                if parent_id:
+                    query += f" and '{parent_id}' in parents"
+
+                results = self._execute_with_backoff(self._service().files().list(
+                    q=query, spaces='drive', pageSize=1, fields="files(id)"
+                ))
+                folders = results.get('files', [])
+
+                if folders:
+                    folder_id = folders[0]['id']
+                    logger.debug(f"Found existing folder: {folder_name} ({folder_id})")
+                    with self._cache_lock:
+                        self.folder_cache[cache_key] = folder_id
+                    return folder_id
+
+                # Create new folder
+                folder_metadata = {
+                    'name': folder_name,
+                    'mimeType': 'application/vnd.google-apps.folder'
+                }
+                if parent_id:
+                    folder_metadata['parents'] = [parent_id]
+
+                folder = self._execute_with_backoff(
+                    self._service().files().create(body=folder_metadata, fields='id')
+                )
+                folder_id = folder.get('id')
+                logger.info(f"Created new folder: {folder_name} ({folder_id})")
+                with self._cache_lock:
+                    self.folder_cache[cache_key] = folder_id
                 return folder_id
 
-            # Create new folder
-            folder_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            if parent_id:
-                folder_metadata['parents'] = [parent_id]
+            except Exception as e:
+                logger.error(f"Failed to find/create folder '{folder_name}': {e}")
+                return None
+
+    def _next_file_id(self) -> str:
+        """Pop a pre-allocated file ID, reserving a new batch from Drive when the pool is empty."""
+        with self._id_pool_lock:
+            if not self._id_pool:
+                response = self._execute_with_backoff(
+                    self._service().files().generateIds(count=ID_BATCH_SIZE, space='drive')
+                )
+                self._id_pool.extend(response.get('ids', []))
+            return self._id_pool.popleft()
+
+    def _prime_folder_cache(self, root_id: str, batch_size: int = 40):
+        """
+        Pre-populate the folder cache with every folder below a root folder.
 
-            folder = self.service.files().create(body=folder_metadata, fields='id').execute()
-            folder_id = folder.get('id')
-            logger.info(f"Created new folder: {folder_name} ({folder_id})")
-            self.folder_cache[cache_key] = folder_id
-            return folder_id
+        Walks the tree level by level, listing the children of many parents
+        per query so the whole tree costs a handful of paginated requests
+        instead of one lookup per folder.
 
-        except Exception as e:
-            logger.error(f"Failed to find/create folder '{folder_name}': {e}")
-            return None
+        Args:
+            root_id: Drive folder ID to start from
+            batch_size: Number of parent folders combined into one query
+        """
+        frontier = [root_id]
+        primed = 0
+
+        while frontier:
+            next_frontier = []
+
+            for i in range(0, len(frontier), batch_size):
+                parents = set(frontier[i:i + batch_size])
+                parent_clause = " or ".join(f"'{parent}' in parents" for parent in parents)
+                query = f"mimeType='application/vnd.google-apps.folder' and trashed=false and ({parent_clause})"
+                page_token = None
+
+                while True:
+                    results = self._execute_with_backoff(self._service().files().list(
+                        q=query,
+                        spaces='drive',
+                        pageSize=1000,
+                        fields="nextPageToken, files(id, name, parents)",
+                        pageToken=page_token
+                    ))
+
+                    with self._cache_lock:
+                        for folder in results.get('files', []):
+                            for parent in folder.get('parents', []):
+                                if parent in parents:
+                                    self.folder_cache.setdefault((parent, folder['name']), folder['id'])
+                            next_frontier.append(folder['id'])
+                            primed += 1
+
+                    page_token = results.get('nextPageToken')
+                    if not page_token:
+                        break
+
+            frontier = next_frontier
+
+        logger.info(f"Primed folder cache with {primed} existing folders")
+
+    def _list_folder_files(self, folder_id: str) -> Dict[str, dict]:
+        """
+        List all files in a Drive folder along with their size and checksum.
 
-    def upload_file(self, file_path: Path, folder_id: str, file_name: Optional[str] = None) -> bool:
+        Args:
+            folder_id: Drive folder ID to list
+
+        Returns:
+            Dictionary mapping file names to their Drive metadata
+        """
+        files: Dict[str, dict] = {}
+        query = f"'{folder_id}' in parents and trashed=false"
+        page_token = None
+
+        while True:
+            results = self._execute_with_backoff(self._service().files().list(
+                q=query,
+                spaces='drive',
+                pageSize=1000,
+                fields="nextPageToken, files(id, name, md5Checksum, size)",
+                pageToken=page_token
+            ))
+            for f in results.get('files', []):
+                files.setdefault(f['name'], f)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return files
+
+    @contextmanager
+    def _media_upload(self, file_path: Path, file_size: int):
+        """
+        Build the media body, using a resumable session only for large files.
+
+        Large files are read through _ReadAheadFile so disk reads overlap with
+        the upload; the file is closed when the context exits.
+        """
+        mimetype = MIME_TYPES.get(file_path.suffix.lower())
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        if file_size > RESUMABLE_THRESHOLD:
+            with _ReadAheadFile(file_path) as reader:
+                yield MediaIoBaseUpload(reader, mimetype=mimetype, resumable=True,
+                                        chunksize=UPLOAD_CHUNK_SIZE)
+        else:
+            yield MediaFileUpload(str(file_path), mimetype=mimetype, resumable=False)
+
+    def upload_file(self, file_path: Path, folder_id: str, file_name: Optional[str] = None,
+                    file_size: Optional[int] = None) -> bool:
         """
         Upload a file to Google Drive.
 
+        Files that already exist in the folder are skipped when their size and
+        MD5 match, and have their content replaced otherwise.
+
         Args:
             file_path: Local path to the file
             folder_id: Destination folder ID in Drive
             file_name: Optional custom name (defaults to file_path name)
+            file_size: Size of the file in bytes if already known (avoids another stat)
 
         Returns:
             True if successful, False otherwise
         """
-        if not file_path.exists():
-            logger.warning(f"File not found: {file_path}")
-            return False
+        if file_size is None:
+            try:
+                file_size = file_path.stat().st_size
+            except FileNotFoundError:
+                logger.warning(f"File not found: {file_path}")
+                return False
 
         name = file_name or file_path.name
 
         try:
-            # Check if file already exists
-            query = f"name='{name}' and '{folder_id}' in parents and trashed=false"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
-            existing = results.get('files', [])
-
-            if existing:
-                logger.debug(f"File already exists in Drive: {name}")
+            service = self._service()
+
+            # Check if file already exists, using the folder listing when we have one
+            remote_files = self._remote_index.get(folder_id)
+            if remote_files is not None:
+                remote = remote_files.get(name)
+            else:
+                query = f"name='{_q_escape(name)}' and '{folder_id}' in parents and trashed=false"
+                results = self._execute_with_backoff(service.files().list(
+                    q=query, spaces='drive', pageSize=1, fields="files(id, md5Checksum, size)"
+                ))
+                found = results.get('files', [])
+                remote = found[0] if found else None
+
+            if remote is not None:
+                if _matches_remote(file_path, file_size, remote):
+                    logger.debug(f"File already exists in Drive: {name}")
+                    return True
+
+                logger.info(f"Updating changed file: {name}")
+                with self._media_upload(file_path, file_size) as media:
+                    self._execute_with_backoff(service.files().update(
+                        fileId=remote['id'],
+                        media_body=media,
+                        fields='id'
+                    ))
+                if remote_files is not None:
+                    remote_files[name] = {'id': remote['id'], 'size': str(file_size)}
                 return True
 
-            # Upload file
-            media = MediaFileUpload(str(file_path), resumable=True)
-
+            # Never handed back on failure: a create that errored may still have used the ID server-side
+            file_id = self._next_file_id()
             file_metadata = {
+                'id': file_id,
                 'name': name,
                 'parents': [folder_id]
             }
 
             logger.info(f"Uploading: {name}")
-            self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
+            # Small files skip the extra round trip of opening a resumable session
+            with self._media_upload(file_path, file_size) as media:
+                self._execute_with_backoff(service.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields='id'
+                ))
+
+            if remote_files is not None:
+                remote_files[name] = {'id': file_id, 'size': str(file_size)}
 
             logger.debug(f"Successfully uploaded: {name}")
             return True
@@ -191,6 +635,49 @@ class DriveUploader:
             logger.error(f"Failed to upload '{name}': {e}")
             return False
 
+    def _write_bundle(self, files: List[Tuple[str, str, int]], bundle_stem: str) -> Tuple[Path, str]:
+        """
+        Pack files into a compressed tarball in a temporary file.
+
+        Uses zstandard when installed, otherwise falls back to gzip.
+
+        Args:
+            files: (path, name, size) tuples to pack
+            bundle_stem: Archive name without extension
+
+        Returns:
+            Tuple of (temporary archive path, archive name for Drive)
+
+        Raises:
+            Whatever packing raised (OSError, tarfile or zstandard errors); the partial archive is deleted first
+        """
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = None
+
+        suffix = '.tar.zst' if zstandard else '.tar.gz'
+        fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if zstandard:
+                    with zstandard.ZstdCompressor().stream_writer(fh, closefd=False) as writer, \
+                            tarfile.open(fileobj=writer, mode='w|') as tar:
+                        for path, name, _ in files:
+                            tar.add(path, arcname=name)
+                else:
+                    # Fixed gzip mtime keeps the archive checksum stable for unchanged content
+                    with gzip.GzipFile(fileobj=fh, mode='wb', mtime=0) as gz, \
+                            tarfile.open(fileobj=gz, mode='w') as tar:
+                        for path, name, _ in files:
+                            tar.add(path, arcname=name)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        return Path(tmp_path), f"{bundle_stem}{suffix}"
+
     def upload_category(self, category_path: Path, parent_folder_id: str) -> bool:
         """
         Upload an entire category folder with all subcategories.
@@ -202,7 +689,11 @@ class DriveUploader:
         Returns:
             True if successful, False otherwise
         """
-        if not category_path.exists() or not category_path.is_dir():
+        # One listing tells both whether the folder exists and which entries are topic folders
+        try:
+            with os.scandir(category_path) as entries:
+                topic_entries = list(entries)
+        except (FileNotFoundError, NotADirectoryError):
             logger.warning(f"Category folder not found: {category_path}")
             return False
 
@@ -217,32 +708,67 @@ class DriveUploader:
         success_count = 0
         fail_count = 0
 
-        # Upload each subcategory (topic)
-        for topic_path in category_path.iterdir():
-            if not topic_path.is_dir():
-                # Upload JSON files directly to category folder
-                if topic_path.suffix == '.json':
-                    if self.upload_file(topic_path, category_folder_id):
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                continue
-
-            topic_name = topic_path.name
-
-            # Create or find topic subfolder in Drive
-            topic_folder_id = self.find_or_create_folder(topic_name, category_folder_id)
-            if not topic_folder_id:
-                fail_count += 1
-                continue
-
-            # Upload all files in topic folder
-            for item in topic_path.rglob('*'):
-                if item.is_file():
-                    if self.upload_file(item, topic_folder_id):
-                        success_count += 1
-                    else:
-                        fail_count += 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Upload each subcategory (topic)
+            for entry in topic_entries:
+                topic_path = Path(entry.path)
+                if not entry.is_dir():
+                    # Upload JSON files directly to category folder
+                    if topic_path.suffix == '.json':
+                        if self.upload_file(topic_path, category_folder_id):
+                            success_count += 1
+                        else:
+                            fail_count += 1
+                    continue
+
+                topic_name = topic_path.name
+
+                # Create or find topic subfolder in Drive
+                topic_folder_id = self.find_or_create_folder(topic_name, category_folder_id)
+                if not topic_folder_id:
+                    fail_count += 1
+                    continue
+
+                try:
+                    self._remote_index[topic_folder_id] = self._list_folder_files(topic_folder_id)
+                except Exception as e:
+                    logger.error(f"Failed to list folder '{topic_name}': {e}")
+                    fail_count += 1
+                    continue
+
+                files = list(_walk_files(topic_path))
+
+                # Bundle many small files into one archive upload
+                if self.bundle_small_files:
+                    small = [f for f in files if f[2] < SMALL_FILE_SIZE and not f[1].endswith('.json')]
+                    if len(small) > MIN_BUNDLE_FILES and len(small) * 2 > len(files):
+                        try:
+                            bundle_path, bundle_name = self._write_bundle(small, f"{topic_name}_images")
+                        except Exception as e:
+                            # Leave the small files in `files` so they go up one at a time below
+                            logger.warning(f"Could not bundle '{topic_name}', uploading its files individually: {e}")
+                        else:
+                            try:
+                                if self.upload_file(bundle_path, topic_folder_id, file_name=bundle_name):
+                                    success_count += 1
+                                else:
+                                    fail_count += 1
+                            finally:
+                                bundle_path.unlink(missing_ok=True)
+
+                            bundled = set(small)
+                            files = [f for f in files if f not in bundled]
+
+                # Upload remaining files in topic folder concurrently, largest first so big
+                # resumable uploads overlap with the small ones instead of trailing at the end
+                files.sort(key=lambda f: f[2], reverse=True)
+                results = list(executor.map(
+                    lambda f: self.upload_file(Path(f[0]), topic_folder_id, file_name=f[1], file_size=f[2]),
+                    files
+                ))
+                uploaded = sum(results)
+                success_count += uploaded
+                fail_count += len(results) - uploaded
 
         logger.info(f"Category '{category_name}' complete: {success_count} uploaded, {fail_count} failed")
         return fail_count == 0
@@ -262,16 +788,23 @@ class DriveUploader:
             logger.error("Not authenticated. Call authenticate() first.")
             return {}
 
-        if not base_path.exists():
+        try:
+            with os.scandir(base_path) as entries:
+                category_entries = list(entries)
+        except (FileNotFoundError, NotADirectoryError):
             logger.error(f"Base path not found: {base_path}")
             return {}
 
+        try:
+            self._prime_folder_cache(target_folder_id)
+        except Exception as e:
+            logger.warning(f"Could not prime folder cache, falling back to per-folder lookups: {e}")
+
         results = {}
 
-        for category_path in base_path.iterdir():
-            if category_path.is_dir() and not category_path.name.startswith('.'):
-                category_name = category_path.name
-                results[category_name] = self.upload_category(category_path, target_folder_id)
+        for entry in category_entries:
+            if entry.is_dir() and not entry.name.startswith('.'):
+                results[entry.name] = self.upload_category(Path(entry.path), target_folder_id)
 
         return results
 
@@ -292,13 +825,12 @@ def get_folder_id_from_url(folder_url: str) -> str:
     """
     # Extract ID from URL
     # Handles various Google Drive URL formats
-    if '/folders/' in folder_url:
-        return folder_url.split('/folders/')[-1].split('?')[0]
-    elif '?id=' in folder_url:
-        return folder_url.split('?id=')[-1].split('&')[0]
-    else:
-        # Assume it's already an ID
-        return folder_url.strip('/')
+    match = _FOLDER_ID_RE.search(folder_url)
+    if match:
+        return match.group(1)
+
+    # Assume it's already an ID
+    return folder_url.strip('/')
 
 
 if __name__ == "__main__":
@@ -5,20 +5,24 @@ Scrapes Pinterest images across multiple aesthetic topics with NSFW filtering.
 
 import asyncio
 import random
-import json
+import re
 import os
 import logging
-import hashlib
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
+from urllib.parse import urlsplit
 from typing import Set, List, Dict, Tuple
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import aiohttp
+import aiofiles
+import orjson
 from dotenv import load_dotenv
 
 from topics import get_all_topics, get_topics_for_categories
 from drive_uploader import DriveUploader, get_folder_id_from_url
-from nsfw_filter import NSFWDetector
+from nsfw_filter import get_detector
 
 load_dotenv()
 
@@ -37,6 +41,10 @@ CONFIG = {
     "log_level": os.getenv("LOG_LEVEL", "INFO"),
     "enable_drive_upload": os.getenv("ENABLE_DRIVE_UPLOAD", "false").lower() == "true",
     "drive_folder_url": os.getenv("DRIVE_FOLDER_URL", ""),
+    "remember_seen_pins": os.getenv("REMEMBER_SEEN_PINS", "true").lower() == "true",
+    "drive_upload_workers": int(os.getenv("DRIVE_UPLOAD_WORKERS", "6")),
+    "drive_bundle_small_files": os.getenv("DRIVE_BUNDLE_SMALL_FILES", "false").lower() == "true",
+    "stealth_delays": os.getenv("STEALTH_DELAYS", "false").lower() == "true",
 }
 
 NSFW_BLOCKLIST = [
@@ -45,6 +53,92 @@ NSFW_BLOCKLIST = [
     "sex", "topless", "underwear", "braless", "see-through", "explicit", "fetish",
 ]
 
+# Single-pass matcher for the blocklist (plain substring matches, like the list itself)
+_NSFW_RE = re.compile("|".join(re.escape(kw) for kw in NSFW_BLOCKLIST), re.IGNORECASE)
+
+# Pin ID in a pin link such as /pin/123456789/
+_PIN_ID_RE = re.compile(r"/pin/([^/?#]+)")
+
+# Size segment of a pinimg URL (e.g. /236x/), swapped for /originals/ to fetch full resolution
+_SIZE_RE = re.compile(r"/(?:236|474|564|736)x/")
+
+# Resource types the scraper never reads; pin image URLs stay in the DOM even when aborted
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "websocket"}
+
+# Analytics/ad hosts aborted regardless of resource type (matched with their subdomains)
+BLOCKED_HOSTS = (
+    "doubleclick.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "segment.io",
+    "log.pinterest.com",
+)
+
+# Subdomain suffixes of BLOCKED_HOSTS, so matches stop at a dot (blog.pinterest.com stays allowed)
+_BLOCKED_HOST_SUFFIXES = tuple("." + host for host in BLOCKED_HOSTS)
+
+# Pinterest's internal search API; its JSON responses carry the pins loaded while scrolling
+SEARCH_RESOURCE_PATH = "/resource/BaseSearchResource/get/"
+
+# Extracts every rendered pin in one round trip instead of several Playwright calls per pin
+PIN_EXTRACT_JS = """
+() => Array.from(document.querySelectorAll('div[data-test-id="pin"]')).flatMap(el => {
+    const href = el.querySelector('a[href*="/pin/"]')?.getAttribute('href') || '';
+    const image_url = el.querySelector('img[src*="pinimg.com"]')?.getAttribute('src') || null;
+    // Tag each node with the pin it was read as, so later scrolls only return new pins.
+    // Incomplete nodes stay untagged and are retried; recycled grid nodes get a new href.
+    if (!href || !image_url || el.dataset.seen === href) return [];
+    el.dataset.seen = href;
+    return [{
+        title: el.querySelector('div[data-test-id="pin-title"]')?.innerText || '',
+        description: el.querySelector('div[data-test-id="pin-description"]')?.innerText || '',
+        image_url,
+        href,
+    }];
+})
+"""
+
+# 2-5 scrolls of random distance with a 0.8-2.2s pause after each; takes the viewport height
+HUMAN_SCROLL_JS = """
+async (viewportHeight) => {
+    const uniform = (min, max) => min + Math.random() * (max - min);
+    const steps = 2 + Math.floor(Math.random() * 4);
+    for (let i = 0; i < steps; i++) {
+        window.scrollBy(0, Math.floor(uniform(300, viewportHeight - 200)));
+        await new Promise(resolve => setTimeout(resolve, uniform(800, 2200)));
+    }
+}
+"""
+
+# Chunk size used when streaming image downloads to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Pinterest cookies/local storage shared by every browser context; reused across runs
+SESSION_STATE_PATH = Path(CONFIG["output_folder"]) / "pinterest_state.json"
+
+# Re-capture the session state after this many completed topics
+SESSION_REFRESH_TOPICS = 25
+
+# How long a topic page waits for the cookie banner before scrolling
+COOKIE_BANNER_TIMEOUT_MS = 1500
+
+# How long a fast scroll waits for the next page of search results
+FAST_SCROLL_TIMEOUT_MS = 10000
+
+# Stop scrolling a topic when more than DUPLICATE_RATE_LIMIT of the last
+# DUPLICATE_WINDOW newly surfaced pins were already collected, for
+# DUPLICATE_SCROLL_LIMIT scrolls in a row
+DUPLICATE_WINDOW = 100
+DUPLICATE_RATE_LIMIT = 0.8
+DUPLICATE_SCROLL_LIMIT = 2
+
+# Connection pool for image downloads, shared by every topic in a run
+DOWNLOAD_CONNECTION_LIMIT = 200
+DOWNLOAD_CONNECTION_LIMIT_PER_HOST = 50
+
+# Upper bound on images classified per NSFW detector call
+NSFW_BATCH_SIZE = 16
+
 def setup_logging():
     """Configure logging based on LOG_LEVEL."""
     log_level = getattr(logging, CONFIG["log_level"].upper(), logging.INFO)
@@ -61,75 +155,139 @@ def setup_logging():
 
 logger = setup_logging()
 
+@dataclass(slots=True)
+class Pin:
+    """A collected pin; serialized by orjson as a plain JSON object."""
+    pin_id: str
+    title: str
+    description: str
+    image_url: str
+    pin_url: str
+    category: str
+    topic: str
+    scraped_at: str
+
 def is_text_safe(title: str, description: str) -> bool:
     """Check if pin text is safe (no NSFW keywords)."""
-    text = (title + " " + description).lower()
-    return not any(kw in text for kw in NSFW_BLOCKLIST)
+    return _NSFW_RE.search(title + " " + description) is None
 
 def get_pin_hash(pin_id: str) -> str:
-    """Generate hash for deduplication."""
-    return hashlib.md5(pin_id.encode()).hexdigest()[:16]
+    """Return the deduplication key for a pin (pin IDs are already unique)."""
+    return pin_id
+
+def load_seen_hashes(path: Path) -> Set[str]:
+    """Load pin hashes collected by previous runs."""
+    try:
+        return set(path.read_text(encoding="utf-8").split())
+    except FileNotFoundError:
+        return set()
+
+def append_seen_hashes(path: Path, hashes: List[str]):
+    """Record newly collected pin hashes so later runs skip them."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(f"{h}\n" for h in hashes))
+
+def save_topic_pins(json_path: Path, pins: List[Pin]):
+    """Write a topic's pin metadata, keeping the pins saved there by earlier runs."""
+    try:
+        saved = orjson.loads(json_path.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        saved = []
+
+    new_ids = {pin.pin_id for pin in pins}
+    merged = [pin for pin in saved if pin.get("pin_id") not in new_ids] + pins
+    with open(json_path, "wb") as f:
+        f.write(orjson.dumps(merged, option=orjson.OPT_INDENT_2))
+
+async def download_images_batch(session: aiohttp.ClientSession, pins: List[Pin], category: str, topic: str, output_base: Path) -> List[Pin]:
+    """
+    Download multiple images concurrently, NSFW-checking each pin's thumbnail before fetching the original.
 
-async def download_images_batch(pins: List[Dict], category: str, topic: str, output_base: Path):
-    """Download multiple images concurrently with NSFW filtering on full-resolution images."""
+    Returns:
+        Pins that are done with: downloaded, already on disk, or filtered as NSFW (failed downloads are left out)
+    """
     if not CONFIG["download_images"]:
-        return
+        return pins
 
     images_dir = output_base / category / topic.replace(" ", "_") / "images"
     images_dir.mkdir(parents=True, exist_ok=True)
 
-    semaphore = asyncio.Semaphore(CONFIG["max_concurrent_downloads"])
+    # One directory listing instead of a stat per pin when resuming
+    existing_files = {entry.name for entry in os.scandir(images_dir)}
+
+    semaphore = asyncio.BoundedSemaphore(CONFIG["max_concurrent_downloads"])
 
-    # Initialize NSFW detector once if enabled
+    # Shared NSFW detector; the model is loaded once per run, not per topic
     nsfw_detector = None
     if CONFIG["use_nsfw_detector"]:
         try:
-            nsfw_detector = NSFWDetector(threshold=CONFIG["nsfw_threshold"])
+            nsfw_detector = get_detector(CONFIG["nsfw_threshold"])
             logger.info(f"NSFW filtering enabled: {nsfw_detector.get_backend_name()}")
         except ImportError as e:
             logger.error(f"Failed to initialize NSFW detector: {e}")
             logger.info("Proceeding without NSFW image detection")
 
-    async def download_with_semaphore(session: aiohttp.ClientSession, pin: Dict):
+    # Downloads hand their bytes to one classifier task, which runs the
+    # detector over whatever has queued up while the previous batch ran
+    nsfw_queue: asyncio.Queue = asyncio.Queue()
+
+    async def classify_batches():
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await nsfw_queue.get()]
+            while len(batch) < NSFW_BATCH_SIZE and not nsfw_queue.empty():
+                batch.append(nsfw_queue.get_nowait())
+
+            try:
+                verdicts = await loop.run_in_executor(
+                    None, nsfw_detector.is_nsfw_from_bytes_batch, [image_bytes for image_bytes, _ in batch]
+                )
+                for (_, verdict), is_nsfw in zip(batch, verdicts):
+                    verdict.set_result(is_nsfw)
+            except Exception as e:
+                for _, verdict in batch:
+                    verdict.set_exception(e)
+
+    async def download_with_semaphore(pin: Pin):
         async with semaphore:
-            img_filename = f"{pin['pin_id']}.jpg"
+            img_filename = f"{pin.pin_id}.jpg"
             img_path = images_dir / img_filename
 
-            if img_path.exists():
+            if img_filename in existing_files:
                 return {"path": img_path, "success": True, "skipped": False}
 
-            # Download full resolution image to memory first
-            full_url = pin["image_url"].replace("236x", "originals").replace("564x", "originals")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Referer': 'https://www.pinterest.com/'
-            }
+            full_url = _SIZE_RE.sub("/originals/", pin.image_url, count=1)
 
             try:
-                async with session.get(full_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                # Check NSFW on the small thumbnail so rejected pins never fetch the original
+                if nsfw_detector:
+                    try:
+                        async with session.get(pin.image_url, proxy=CONFIG["proxy"]) as response:
+                            response.raise_for_status()
+                            thumb_bytes = await response.read()
+
+                        verdict = asyncio.get_running_loop().create_future()
+                        await nsfw_queue.put((thumb_bytes, verdict))
+                        is_nsfw = await verdict
+
+                        if is_nsfw:
+                            logger.debug(f"Filtered NSFW image (thumbnail): {img_filename}")
+                            return {"path": img_path, "success": False, "skipped": "NSFW"}
+                    except Exception as e:
+                        logger.debug(f"NSFW check failed for {img_filename}: {e}")
+                        # Continue with download if check fails
+
+                async with session.get(full_url, proxy=CONFIG["proxy"]) as response:
                     if response.status != 200:
                         logger.debug(f"Failed to download {img_filename}: HTTP {response.status}")
                         return {"path": img_path, "success": False, "skipped": False}
 
-                    # Read full image bytes into memory
-                    image_bytes = await response.read()
-
-                    # Check NSFW on the actual full-resolution image before saving
-                    if nsfw_detector:
-                        try:
-                            is_nsfw = await asyncio.get_event_loop().run_in_executor(
-                                None, nsfw_detector.is_nsfw_from_bytes, image_bytes
-                            )
-
-                            if is_nsfw:
-                                logger.debug(f"Filtered NSFW image (full-resolution): {img_filename}")
-                                return {"path": img_path, "success": False, "skipped": "NSFW"}
-                        except Exception as e:
-                            logger.debug(f"NSFW check failed for {img_filename}: {e}")
-                            # Continue with save if check fails
-
-                    # Save the image to disk only after passing NSFW check
-                    img_path.write_bytes(image_bytes)
+                    # Stream straight to disk to keep memory flat
+                    part_path = img_path.with_suffix(".part")
+                    async with aiofiles.open(part_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            await f.write(chunk)
+                    part_path.replace(img_path)
                     logger.debug(f"Downloaded: {img_filename}")
                     return {"path": img_path, "success": True, "skipped": False}
 
@@ -137,26 +295,44 @@ async def download_images_batch(pins: List[Dict], category: str, topic: str, out
                 logger.debug(f"Failed: {img_filename} - {e}")
                 return {"path": img_path, "success": False, "skipped": False}
 
-    # Use session properly
-    async with aiohttp.ClientSession() as session:
-        tasks = [download_with_semaphore(session, pin) for pin in pins]
+    classifier = asyncio.create_task(classify_batches()) if nsfw_detector else None
+    try:
+        tasks = [download_with_semaphore(pin) for pin in pins]
         results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        if classifier:
+            classifier.cancel()
 
-        success_count = sum(1 for r in results if isinstance(r, dict) and r.get("success"))
-        nsfw_filtered = sum(1 for r in results if isinstance(r, dict) and r.get("skipped") == "NSFW")
+    success_count = sum(1 for r in results if isinstance(r, dict) and r.get("success"))
+    nsfw_filtered = sum(1 for r in results if isinstance(r, dict) and r.get("skipped") == "NSFW")
 
-        logger.info(f"Downloaded {success_count}/{len(pins)} images for [{category}] {topic}")
+    logger.info(f"Downloaded {success_count}/{len(pins)} images for [{category}] {topic}")
 
-        if nsfw_filtered > 0:
-            logger.info(f"NSFW filter: Skipped {nsfw_filtered}/{len(pins)} images for [{category}] {topic}")
+    if nsfw_filtered > 0:
+        logger.info(f"NSFW filter: Skipped {nsfw_filtered}/{len(pins)} images for [{category}] {topic}")
+
+    return [pin for pin, r in zip(pins, results) if isinstance(r, dict) and (r["success"] or r["skipped"])]
+
+def create_download_session() -> aiohttp.ClientSession:
+    """Create the HTTP session shared by all image downloads in a run, keeping CDN connections warm."""
+    connector = aiohttp.TCPConnector(
+        limit=DOWNLOAD_CONNECTION_LIMIT,
+        limit_per_host=DOWNLOAD_CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Referer': 'https://www.pinterest.com/'
+        },
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
 
 async def human_like_scroll(page):
-    """Smooth human-like scrolling."""
-    viewport_height = page.viewport_size["height"]
-    for _ in range(random.randint(2, 5)):
-        scroll_distance = random.randint(300, viewport_height - 200)
-        await page.evaluate(f"window.scrollBy(0, {scroll_distance})")
-        await asyncio.sleep(random.uniform(0.8, 2.2))
+    """Smooth human-like scrolling, run entirely in the page with one evaluate call."""
+    await page.evaluate(HUMAN_SCROLL_JS, page.viewport_size["height"])
 
 async def random_mouse_move(page):
     """Random mouse movements to look more human."""
@@ -166,172 +342,287 @@ async def random_mouse_move(page):
     await page.mouse.move(x, y, steps=random.randint(8, 15))
     await asyncio.sleep(random.uniform(0.3, 1.0))
 
+async def fast_scroll(page):
+    """Jump to the bottom of the page and wait for the next batch of search results."""
+    try:
+        async with page.expect_response(lambda r: SEARCH_RESOURCE_PATH in r.url, timeout=FAST_SCROLL_TIMEOUT_MS):
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    except PlaywrightTimeoutError:
+        pass
+
 async def random_delay(min_sec: float = 1.8, max_sec: float = 4.2):
     """Random delay to mimic human behavior."""
     await asyncio.sleep(random.uniform(min_sec, max_sec))
 
+async def launch_browser(playwright):
+    """Launch the Chromium instance shared by all topics."""
+    return await playwright.chromium.launch(
+        headless=CONFIG["headless"],
+        proxy={"server": CONFIG["proxy"]} if CONFIG["proxy"] else None,
+        args=[
+            "--no-sandbox",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-web-security",
+            "--disable-features=VizDisplayCompositor"
+        ]
+    )
+
+async def create_context(browser, storage_state: Dict = None):
+    """Create a browser context with the stealth settings applied."""
+    context = await browser.new_context(
+        storage_state=storage_state,
+        viewport={"width": 1920, "height": 1080},
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+        locale="en-US",
+        timezone_id="America/New_York",
+        extra_http_headers={
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5",
+            "Accept-Encoding": "gzip, deflate, br",
+            "DNT": "1",
+            "Connection": "keep-alive",
+            "Upgrade-Insecure-Requests": "1",
+        }
+    )
+
+    # Add stealth script
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined,
+        });
+        
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5],
+        });
+        
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['en-US', 'en'],
+        });
+        
+        window.chrome = {
+            runtime: {},
+        };
+    """)
+
+    return context
+
+async def block_heavy_resources(route):
+    """Abort requests for resources that are not needed to read pin data."""
+    host = urlsplit(route.request.url).hostname or ""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES or host in BLOCKED_HOSTS or host.endswith(_BLOCKED_HOST_SUFFIXES):
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def load_session_state(browser) -> Dict:
+    """
+    Load the cached Pinterest session, visiting the homepage once if there is none.
+
+    Args:
+        browser: Shared browser used to establish a fresh session
+
+    Returns:
+        Playwright storage state (cookies and origins), empty if the homepage could not be loaded
+    """
+    try:
+        state = orjson.loads(SESSION_STATE_PATH.read_bytes())
+        logger.info(f"Reusing Pinterest session from {SESSION_STATE_PATH}")
+        return state
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        pass
+
+    context = await create_context(browser)
+    try:
+        page = await context.new_page()
+        await page.route("**/*", block_heavy_resources)
+        await page.goto("https://www.pinterest.com", wait_until="domcontentloaded", timeout=CONFIG["timeout"])
+
+        # Accept cookies once here so the consent cookie is part of the cached session
+        try:
+            await page.get_by_role("button", name="Accept all").click(timeout=8000)
+        except:
+            pass
+
+        if CONFIG["stealth_delays"]:
+            await random_delay(2, 4)
+        logger.info(f"Saved new Pinterest session to {SESSION_STATE_PATH}")
+        return await context.storage_state(path=SESSION_STATE_PATH)
+    except Exception as e:
+        # Topics still work without the session; they just start without Pinterest cookies
+        logger.warning(f"Could not establish a Pinterest session, continuing without one: {e}")
+        return {"cookies": [], "origins": []}
+    finally:
+        await context.close()
+
+async def reset_context(context, session_state: Dict):
+    """Close leftover pages and restore the shared session cookies so a context can serve the next topic."""
+    for page in context.pages:
+        await page.close()
+    await context.clear_cookies()
+    await context.add_cookies(session_state["cookies"])
+
 async def scrape_topic(
+    context,
     category: str,
     topic: str,
     collected_hashes: Set[str],
     _output_base: Path,
     progress_callback = None,
     max_retries: int = 3
-) -> List[Dict]:
+) -> List[Pin]:
     """
     Scrape Pinterest for a single topic.
 
     Args:
+        context: Browser context to open the search page in
         category: Category name (e.g., "STUDY_ACADEMIA")
         topic: Topic keyword to search
         collected_hashes: Set of already collected pin hashes (for deduplication)
         output_base: Base output directory
-        progress_callback: Optional callback for progress updates
+        progress_callback: Optional callback called after each scroll with the pins collected so far
 
     Returns:
-        List of collected pin data
+        List of collected pins
     """
     logger.info(f"Starting scrape: [{category}] {topic}")
     collected_pins = []
 
-    for attempt in range(max_retries):
+    # Pins already seen on this topic's page, and whether each of the most recent ones was a duplicate
+    surfaced_pins: Set[str] = set()
+    recent_duplicates = deque(maxlen=DUPLICATE_WINDOW)
+    search_exhausted = False
+
+    def add_pin(pin_id: str, title: str, description: str, img_src: str, pin_url: str):
+        """Filter a scraped pin and collect it if it is new and safe."""
+        if len(collected_pins) >= CONFIG["max_pins_per_topic"] or not (img_src and pin_id):
+            return
+
+        # The rendered grid is re-read every scroll; only judge each pin once
+        if pin_id in surfaced_pins:
+            return
+        surfaced_pins.add(pin_id)
+
+        pin_hash = get_pin_hash(pin_id)
+
+        # Check duplicates
+        is_duplicate = pin_hash in collected_hashes
+        recent_duplicates.append(is_duplicate)
+        if is_duplicate:
+            return
+
+        # Safety check
+        if not is_text_safe(title, description):
+            logger.debug(f"Filtered NSFW pin: {title[:50]}")
+            return
+
+        collected_pins.append(Pin(
+            pin_id=pin_id,
+            title=title,
+            description=description,
+            image_url=img_src,
+            pin_url=f"https://www.pinterest.com{pin_url}" if pin_url else "",
+            category=category,
+            topic=topic,
+            scraped_at=datetime.now().isoformat(),
+        ))
+        collected_hashes.add(pin_hash)
+
+        logger.debug(f"[{category}] {topic}: Found pin {len(collected_pins)}")
+
+    async def on_response(response):
+        """Harvest pins from the search API responses triggered by scrolling."""
+        nonlocal search_exhausted
+        if SEARCH_RESOURCE_PATH not in response.url:
+            return
+
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(
-                    headless=CONFIG["headless"],
-                    proxy={"server": CONFIG["proxy"]} if CONFIG["proxy"] else None,
-                    args=[
-                        "--no-sandbox",
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-web-security",
-                        "--disable-features=VizDisplayCompositor"
-                    ]
-                )
+            data = await response.json()
+            results = data["resource_response"]["data"]["results"] or []
+        except Exception as e:
+            logger.debug(f"Could not parse search response: {e}")
+            return
+
+        if not results:
+            search_exhausted = True
+            return
+
+        for result in results:
+            if result.get("type", "pin") != "pin":
+                continue
+            pin_id = str(result.get("id") or "")
+            images = result.get("images") or {}
+            image = images.get("236x") or images.get("orig") or {}
+            add_pin(
+                pin_id,
+                (result.get("title") or result.get("grid_title") or "").strip(),
+                (result.get("description") or "").strip(),
+                image.get("url"),
+                f"/pin/{pin_id}/" if pin_id else "",
+            )
 
-                context = await browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                    locale="en-US",
-                    timezone_id="America/New_York",
-                    extra_http_headers={
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.5",
-                        "Accept-Encoding": "gzip, deflate, br",
-                        "DNT": "1",
-                        "Connection": "keep-alive",
-                        "Upgrade-Insecure-Requests": "1",
-                    }
-                )
+    search_url = f"https://www.pinterest.com/search/pins/?q={topic.replace(' ', '%20')}"
 
-                # Add stealth script
-                await context.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined,
-                    });
-                    
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => [1, 2, 3, 4, 5],
-                    });
-                    
-                    Object.defineProperty(navigator, 'languages', {
-                        get: () => ['en-US', 'en'],
-                    });
-                    
-                    window.chrome = {
-                        runtime: {},
-                    };
-                """)
+    for attempt in range(max_retries):
+        try:
+            page = await context.new_page()
+            await page.route("**/*", block_heavy_resources)
+            page.on("response", on_response)
 
-                page = await context.new_page()
-                
+            try:
                 # Additional stealth measures
                 await page.evaluate("""
                     delete navigator.__proto__.webdriver;
                 """)
 
-                # Go to Pinterest homepage first to establish session
-                await page.goto("https://www.pinterest.com", wait_until="domcontentloaded", timeout=CONFIG["timeout"])
-                await random_delay(2, 4)
-
-                # Go to search page
-                search_url = f"https://www.pinterest.com/search/pins/?q={topic.replace(' ', '%20')}"
+                # Session cookies come from the shared storage state, so go straight to search
                 await page.goto(search_url, wait_until="domcontentloaded", timeout=CONFIG["timeout"])
 
                 try:
-                    # Accept cookies if popup appears
+                    # Accept cookies if popup appears (rare: consent normally comes with the cached session)
                     try:
-                        await page.get_by_role("button", name="Accept all").click(timeout=8000)
+                        await page.get_by_role("button", name="Accept all").click(timeout=COOKIE_BANNER_TIMEOUT_MS)
                     except:
                         pass
 
                     last_height = await page.evaluate("document.body.scrollHeight")
                     scroll_attempts = 0
                     max_scrolls = 50
+                    duplicate_scrolls = 0
 
                     while len(collected_pins) < CONFIG["max_pins_per_topic"] and scroll_attempts < max_scrolls:
-                        await human_like_scroll(page)
-                        await random_mouse_move(page)
-                        await random_delay()
+                        if CONFIG["stealth_delays"]:
+                            await human_like_scroll(page)
+                            await random_mouse_move(page)
+                            await random_delay()
+                        else:
+                            await fast_scroll(page)
 
-                        # Get current pin elements
-                        pin_elements = await page.query_selector_all('div[data-test-id="pin"]')
+                        # Extract newly rendered pins in a single evaluate call
+                        raw_pins = await page.evaluate(PIN_EXTRACT_JS)
 
-                        for pin_el in pin_elements:
+                        for raw_pin in raw_pins:
                             if len(collected_pins) >= CONFIG["max_pins_per_topic"]:
                                 break
 
                             try:
-                                # Extract pin data
-                                title_el = await pin_el.query_selector('div[data-test-id="pin-title"]')
-                                title = await title_el.inner_text() if title_el else ""
-                                title = title.strip()
-
-                                desc_el = await pin_el.query_selector('div[data-test-id="pin-description"]')
-                                description = await desc_el.inner_text() if desc_el else ""
-                                description = description.strip()
-
-                                img_el = await pin_el.query_selector('img[src*="pinimg.com"]')
-                                img_src = await img_el.get_attribute("src") if img_el else None
-
-                                link_el = await pin_el.query_selector('a[href*="/pin/"]')
-                                pin_url = await link_el.get_attribute("href") if link_el else ""
-                                pin_id = pin_url.split("/pin/")[-1].split("/")[0] if pin_url else ""
-
-                                if img_src and pin_id:
-                                    pin_hash = get_pin_hash(pin_id)
-
-                                    # Check duplicates
-                                    if pin_hash in collected_hashes:
-                                        continue
-
-                                    # Safety check
-                                    if not is_text_safe(title, description):
-                                        logger.debug(f"Filtered NSFW pin: {title[:50]}")
-                                        continue
-
-                                    pin_data = {
-                                        "pin_id": pin_id,
-                                        "title": title,
-                                        "description": description,
-                                        "image_url": img_src,
-                                        "pin_url": f"https://www.pinterest.com{pin_url}" if pin_url else "",
-                                        "category": category,
-                                        "topic": topic,
-                                        "scraped_at": datetime.now().isoformat(),
-                                    }
-
-                                    collected_pins.append(pin_data)
-                                    collected_hashes.add(pin_hash)
-
-                                    if progress_callback:
-                                        progress_callback(category, topic, len(collected_pins))
-
-                                    logger.debug(f"[{category}] {topic}: Found pin {len(collected_pins)}")
-
+                                pin_url = raw_pin["href"]
+                                match = _PIN_ID_RE.search(pin_url)
+                                pin_id = match.group(1) if match else ""
+                                add_pin(
+                                    pin_id,
+                                    raw_pin["title"].strip(),
+                                    raw_pin["description"].strip(),
+                                    raw_pin["image_url"],
+                                    pin_url,
+                                )
                             except Exception as e:
                                 logger.debug(f"Error processing pin element: {e}")
                                 continue
 
+                        # Report progress once per scroll rather than per pin
+                        if progress_callback:
+                            progress_callback(category, topic, len(collected_pins))
+
                         # Check if we stopped loading new content
                         new_height = await page.evaluate("document.body.scrollHeight")
                         if new_height == last_height:
@@ -343,15 +634,28 @@ async def scrape_topic(
                         if len(collected_pins) >= CONFIG["max_pins_per_topic"]:
                             break
 
+                        # Stop early once Pinterest runs out of results or mostly serves pins we already have
+                        if (
+                            len(recent_duplicates) == DUPLICATE_WINDOW
+                            and sum(recent_duplicates) > DUPLICATE_RATE_LIMIT * DUPLICATE_WINDOW
+                        ):
+                            duplicate_scrolls += 1
+                        else:
+                            duplicate_scrolls = 0
+
+                        if search_exhausted or duplicate_scrolls >= DUPLICATE_SCROLL_LIMIT:
+                            logger.info(f"Search results exhausted for [{category}] {topic} after {len(collected_pins)} pins")
+                            break
+
                 except Exception as e:
                     logger.error(f"Error during scraping [{category}] {topic}: {e}")
 
-                finally:
-                    await browser.close()
+            finally:
+                await page.close()
 
-                # If we got pins, break out of retry loop
-                if collected_pins:
-                    break
+            # If we got pins, break out of retry loop
+            if collected_pins:
+                break
 
         except Exception as e:
             logger.error(f"Attempt {attempt + 1} failed for [{category}] {topic}: {e}")
@@ -404,23 +708,44 @@ async def scrape_all_topics():
     output_base = Path(CONFIG["output_folder"])
     output_base.mkdir(exist_ok=True)
 
-    # Track duplicates across all topics
-    collected_hashes: Set[str] = set()
+    # Track duplicates across all topics (and across runs, if enabled)
+    seen_path = output_base / "seen_pins.txt"
+    if CONFIG["remember_seen_pins"]:
+        collected_hashes: Set[str] = load_seen_hashes(seen_path)
+        logger.info(f"Loaded {len(collected_hashes)} pins seen in previous runs")
+    else:
+        collected_hashes = set()
+
+    # Load the NSFW model once up front, off the event loop, so no topic stalls on it
+    if CONFIG["download_images"] and CONFIG["use_nsfw_detector"]:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, get_detector, CONFIG["nsfw_threshold"])
+        except Exception as e:
+            logger.error(f"Failed to initialize NSFW detector: {e}")
+            logger.info("Proceeding without NSFW image detection")
+            CONFIG["use_nsfw_detector"] = False
 
     # Track progress
     tracker = ProgressTracker(len(topics_to_scrape))
 
-    # Store all collected pins
-    all_pins = []
-
-    # Process topics in batches
-    semaphore = asyncio.Semaphore(CONFIG["max_concurrent_topics"])
+    # Every collected pin is appended to one JSON Lines master file as topics finish
+    master_jsonl = output_base / "all_pins.jsonl"
 
     async def scrape_with_limit(category_topic: Tuple[str, str]):
+        nonlocal live_contexts
         category, topic = category_topic
 
-        async with semaphore:
+        # Borrow a context from the pool; this also bounds topic concurrency
+        context = await context_pool.get()
+        if context is None:
+            # Every context was lost; pass the sentinel on so the remaining topics stop too
+            context_pool.put_nowait(None)
+            logger.error(f"Skipping [{category}] {topic}: no browser context left")
+            return
+
+        try:
             pins = await scrape_topic(
+                context,
                 category,
                 topic,
                 collected_hashes,
@@ -434,34 +759,70 @@ async def scrape_all_topics():
                 topic_dir.mkdir(parents=True, exist_ok=True)
 
                 json_path = topic_dir / f"{topic.replace(' ', '_')}_pins.json"
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(pins, f, indent=2, ensure_ascii=False)
+                save_topic_pins(json_path, pins)
 
                 # Download images
-                await download_images_batch(pins, category, topic, output_base)
+                done_pins = await download_images_batch(download_session, pins, category, topic, output_base)
+
+                # Pins whose download failed stay unrecorded so the next run retries them
+                if CONFIG["remember_seen_pins"]:
+                    append_seen_hashes(seen_path, [get_pin_hash(pin.pin_id) for pin in done_pins])
 
                 tracker.complete_topic(category, topic, len(pins))
-                all_pins.extend(pins)
+
+                # Plain synchronous write: no await between lines, so topics never interleave
+                master_file.write(b"".join(orjson.dumps(pin) + b"\n" for pin in pins))
             else:
                 logger.warning(f"No pins collected for [{category}] {topic}")
 
+            # Keep the cached session fresh using the cookies this topic just received
+            if pins and tracker.completed_topics % SESSION_REFRESH_TOPICS == 0:
+                session_state.update(await context.storage_state(path=SESSION_STATE_PATH))
+
             # Random delay between topics
-            await random_delay(3, 8)
+            if CONFIG["stealth_delays"]:
+                await random_delay(3, 8)
+        finally:
+            try:
+                await reset_context(context, session_state)
+            except Exception as e:
+                logger.warning(f"Replacing broken browser context: {e}")
+                try:
+                    context = await create_context(browser, session_state)
+                except Exception as e:
+                    logger.error(f"Could not replace browser context: {e}")
+                    context = None
+
+            if context is not None:
+                context_pool.put_nowait(context)
+            else:
+                live_contexts -= 1
+                if live_contexts == 0:
+                    # Wake the waiting topics instead of leaving them blocked on an empty pool
+                    context_pool.put_nowait(None)
+
+    # Launch one browser for the whole run and hand out reusable contexts
+    with open(master_jsonl, "ab") as master_file:
+        async with create_download_session() as download_session, async_playwright() as p:
+            browser = await launch_browser(p)
+            session_state = await load_session_state(browser)
+
+            context_pool: asyncio.Queue = asyncio.Queue()
+            for _ in range(CONFIG["max_concurrent_topics"]):
+                context_pool.put_nowait(await create_context(browser, session_state))
+            live_contexts = CONFIG["max_concurrent_topics"]
 
-    # Run all topic scrapers
-    tasks = [scrape_with_limit(ct) for ct in topics_to_scrape]
-    await asyncio.gather(*tasks, return_exceptions=True)
+            # Run all topic scrapers
+            tasks = [scrape_with_limit(ct) for ct in topics_to_scrape]
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-    # Save master JSON with all pins
-    master_json = output_base / "all_pins.json"
-    with open(master_json, "w", encoding="utf-8") as f:
-        json.dump(all_pins, f, indent=2, ensure_ascii=False)
+            await browser.close()
 
     logger.info(f"\n{'='*60}")
     logger.info(f"Scraping complete!")
     logger.info(f"Total topics processed: {tracker.completed_topics}/{tracker.total_topics}")
     logger.info(f"Total unique pins collected: {tracker.total_pins}")
-    logger.info(f"Master JSON saved to: {master_json}")
+    logger.info(f"Master JSONL saved to: {master_jsonl}")
     logger.info(f"{'='*60}\n")
 
     # Print category breakdown
@@ -476,13 +837,19 @@ async def scrape_all_topics():
         logger.info("="*60)
 
         try:
-            uploader = DriveUploader()
+            uploader = DriveUploader(
+                max_workers=CONFIG["drive_upload_workers"],
+                bundle_small_files=CONFIG["drive_bundle_small_files"]
+            )
 
             if uploader.authenticate():
                 folder_id = get_folder_id_from_url(CONFIG["drive_folder_url"])
                 logger.info(f"Target folder ID: {folder_id}")
 
-                results = uploader.upload_all(output_base, folder_id)
+                # Uploads are thread-pooled inside DriveUploader; keep the event loop free meanwhile
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, uploader.upload_all, output_base, folder_id
+                )
 
                 # Print upload results
                 success_count = sum(1 for v in results.values() if v)
@@ -514,6 +881,13 @@ if __name__ == "__main__":
     logger.info(f"  Download images: {CONFIG['download_images']}")
     logger.info(f"  Headless: {CONFIG['headless']}")
     logger.info(f"  Concurrent topics: {CONFIG['max_concurrent_topics']}")
+    logger.info(f"  Stealth delays: {CONFIG['stealth_delays']}")
     logger.info("="*60 + "\n")
 
-    asyncio.run(scrape_all_topics())
+    # Faster event loop where available (not on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(scrape_all_topics())
+    else:
+        uvloop.run(scrape_all_topics())
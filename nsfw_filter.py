@@ -3,14 +3,143 @@ NSFW Image Detector Module
 Uses NudeNet for lightweight and fast NSFW detection.
 """
 
+import functools
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 import os
 import tempfile
 
 logger = logging.getLogger(__name__)
 
+# Verdicts remembered per detector, keyed by image content (repins reuse the same image)
+VERDICT_CACHE_SIZE = 50000
+
+# Images per NudeNet forward pass in the batch APIs
+DEFAULT_BATCH_SIZE = 16
+
+# File extensions picked up by filter_directory
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Model NudeDetector loads by default, shipped inside the nudenet package
+NUDENET_MODEL_FILE = "320n.onnx"
+
+# RAM-backed directory for temp images NudeNet reads from disk (system default elsewhere)
+_TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def _use_gpu(detector):
+    """
+    Move NudeNet's ONNX Runtime session onto the GPU when CUDA is available.
+
+    NudeDetector takes a providers argument but does not pass it on to its
+    InferenceSession (nudenet 3.4.2), so a session is built here from
+    NudeNet's bundled model file instead.
+    """
+    try:
+        import onnxruntime
+    except ImportError:
+        return
+
+    if "CUDAExecutionProvider" not in onnxruntime.get_available_providers():
+        return
+
+    import nudenet
+
+    model_path = Path(nudenet.__file__).parent / NUDENET_MODEL_FILE
+    if not model_path.is_file():
+        logger.warning(f"NudeNet model not found at {model_path}, staying on the CPU")
+        return
+
+    try:
+        session = onnxruntime.InferenceSession(
+            str(model_path), providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
+        )
+    except Exception as e:
+        logger.warning(f"Could not start NudeNet on the GPU, staying on the CPU: {e}")
+        return
+
+    if "CUDAExecutionProvider" not in session.get_providers():
+        logger.warning(f"CUDA provider did not activate for NudeNet, staying on the CPU ({session.get_providers()})")
+        return
+
+    detector.onnx_session = session
+    logger.info("NudeNet running on CUDAExecutionProvider")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_nudenet():
+    """
+    Load the NudeNet model once per process; the threshold is applied per detector.
+
+    Returns:
+        (detector, accepts_arrays) where accepts_arrays tells whether NudeNet
+        takes decoded images, so in-memory images can skip temp files
+    """
+    from nudenet import NudeDetector
+
+    logger.info("Loading NudeNet model")
+    detector = NudeDetector()
+    _use_gpu(detector)
+
+    return detector, _warm_up(detector)
+
+
+def _warm_up(detector) -> bool:
+    """
+    Run one blank image through the model so kernel setup is not paid by the first real image.
+
+    Returns:
+        True if NudeNet accepted the image as a decoded array
+    """
+    try:
+        # NudeNet depends on OpenCV and NumPy, so both are available here
+        import cv2
+        import numpy as np
+    except ImportError as e:
+        logger.debug(f"NudeNet warm-up skipped: {e}")
+        return False
+
+    blank = np.zeros((320, 320, 3), dtype=np.uint8)
+    try:
+        detector.detect(blank)
+        return True
+    except Exception as e:
+        logger.debug(f"NudeNet does not take decoded arrays, using temp files: {e}")
+
+    tmp_path = None
+    try:
+        _, encoded = cv2.imencode(".jpg", blank)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg", dir=_TEMP_DIR) as tmp_file:
+            tmp_file.write(encoded.tobytes())
+            tmp_path = tmp_file.name
+
+        detector.detect(tmp_path)
+    except Exception as e:
+        logger.debug(f"NudeNet warm-up skipped: {e}")
+    finally:
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except:
+                pass
+    return False
+
+
+def _decode_image(image_bytes: bytes):
+    """Decode image bytes into a 3-channel BGR array, as cv2.imread does for a file (None if undecodable)."""
+    import cv2
+    import numpy as np
+
+    try:
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+
 
 class NSFWDetector:
     """
@@ -19,6 +148,19 @@ class NSFWDetector:
     NudeNet is lightweight, fast, and has no heavy dependencies.
     """
 
+    # NudeNet classes that count towards the NSFW score
+    _NSFW_CLASSES = frozenset({
+        "FEMALE_GENITALIA_COVERED",  # Treat covered as potentially NSFW too
+        "BUTTOCKS_EXPOSED",
+        "FEMALE_BREAST_EXPOSED",
+        "FEMALE_GENITALIA_EXPOSED",
+        "MALE_BREAST_EXPOSED",
+        "ANUS_EXPOSED",
+        "BELLY_EXPOSED",
+        "MALE_GENITALIA_EXPOSED",
+        "ARMPITS_EXPOSED",
+    })
+
     def __init__(self, threshold: float = 0.7):
         """
         Initialize NSFW detector.
@@ -30,15 +172,16 @@ class NSFWDetector:
         self.threshold = threshold
         self._detector = None
         self._backend_name = None
+        self._accepts_arrays = False
+        self._verdicts: "OrderedDict[bytes, bool]" = OrderedDict()
+        self._verdicts_lock = threading.Lock()
 
         self._initialize_detector()
 
     def _initialize_detector(self):
-        """Initialize the NudeNet detector."""
+        """Initialize the NudeNet detector (the model itself is shared by all detectors)."""
         try:
-            from nudenet import NudeDetector
-
-            self._detector = NudeDetector()
+            self._detector, self._accepts_arrays = _load_nudenet()
             self._backend_name = "NudeNet"
             logger.info(f"Initialized {self._backend_name} detector")
         except Exception as e:
@@ -82,107 +225,222 @@ class NSFWDetector:
             logger.warning("Empty image bytes provided")
             return False
 
+        key = _content_key(image_bytes)
+        cached = self._cached_verdict(key)
+        if cached is not None:
+            return cached
+
         try:
-            return self._check_nudenet_from_bytes(image_bytes)
+            verdict = self._check_nudenet_from_bytes(image_bytes)
         except Exception as e:
             logger.error(f"Error checking NSFW from bytes: {e}")
             return False
 
+        self._remember_verdict(key, verdict)
+        return verdict
+
+    def _cached_verdict(self, key: bytes) -> Optional[bool]:
+        """Get the remembered verdict for an image, if any."""
+        with self._verdicts_lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+            return verdict
+
+    def _remember_verdict(self, key: bytes, verdict: bool):
+        """Remember a verdict, evicting the least recently used beyond VERDICT_CACHE_SIZE."""
+        with self._verdicts_lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            if len(self._verdicts) > VERDICT_CACHE_SIZE:
+                self._verdicts.popitem(last=False)
+
     def _check_nudenet(self, image_path: str) -> bool:
         """Check NSFW using NudeNet."""
         detections = self._detector.detect(image_path)
+        return self._evaluate_detections(detections, image_path)
 
-        # NudeDetector.detect() returns a list of detections
-        # Each detection: {'class': str, 'score': float, 'box': [x, y, w, h]}
-        if not detections:
-            logger.debug(f"NudeNet detected safe: {image_path} (no detections)")
-            return False
+    def _evaluate_detections(self, detections: List[Dict[str, Any]], source: str) -> bool:
+        """
+        Decide whether NudeNet detections for one image are NSFW.
 
-        # Check for NSFW classes
-        nsfw_classes = [
-            "FEMALE_GENITALIA_COVERED",  # Treat covered as potentially NSFW too
-            "BUTTOCKS_EXPOSED",
-            "FEMALE_BREAST_EXPOSED",
-            "FEMALE_GENITALIA_EXPOSED",
-            "MALE_BREAST_EXPOSED",
-            "ANUS_EXPOSED",
-            "BELLY_EXPOSED",
-            "MALE_GENITALIA_EXPOSED",
-            "ARMPITS_EXPOSED",
-        ]
-
-        max_score = 0.0
-        detected_nsfw = False
+        Args:
+            detections: Detections returned by NudeDetector for the image
+            source: Description of the image used in log messages
 
+        Returns:
+            True if image is NSFW, False otherwise
+        """
+        # NudeDetector.detect() returns a list of detections
+        # Each detection: {'class': str, 'score': float, 'box': [x, y, w, h]}
+        # One confident NSFW detection decides the image, so stop at the first
         for detection in detections:
-            class_name = detection.get('class', '')
-            score = detection.get('score', 0.0)
-
-            if class_name in nsfw_classes:
-                detected_nsfw = True
-                max_score = max(max_score, score)
-                logger.debug(f"NudeNet detected NSFW class: {class_name} (score={score:.3f})")
-
-        if detected_nsfw and max_score > self.threshold:
-            logger.debug(f"NudeNet detected NSFW: {image_path} (max_score={max_score:.3f} > threshold={self.threshold})")
-            return True
+            try:
+                class_name, score = detection['class'], detection['score']
+            except KeyError:
+                continue
+
+            if class_name in self._NSFW_CLASSES and score > self.threshold:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"NudeNet detected NSFW: {source} "
+                        f"({class_name} score={score:.3f} > threshold={self.threshold})"
+                    )
+                return True
 
-        logger.debug(f"NudeNet detected safe: {image_path} (max_score={max_score:.3f})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"NudeNet detected safe: {source} ({len(detections)} detections)")
         return False
 
     def _check_nudenet_from_bytes(self, image_bytes: bytes) -> bool:
         """Check NSFW using NudeNet from in-memory bytes."""
-        # NudeNet requires a file path, so save bytes to temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-            tmp_file.write(image_bytes)
-            tmp_path = tmp_file.name
+        detections = self._detect_from_bytes([image_bytes])[0]
+        return self._evaluate_detections(detections, "image from bytes")
+
+    def _detect_from_bytes(self, images: List[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+        """
+        Run NudeNet over in-memory images.
+
+        Images are decoded here to 3-channel arrays, matching what NudeNet gets
+        from a file, so grayscale and alpha images are classified the same way.
+        Images OpenCV cannot decode from memory, or every image when the
+        installed NudeNet takes no arrays, go through temp files in RAM-backed
+        storage instead.
+
+        Args:
+            images: List of image data as bytes
+            batch_size: Number of images per forward pass
 
+        Returns:
+            Detections for each image, in input order
+        """
+        if not self._accepts_arrays:
+            return self._detect_from_files(images, batch_size)
+
+        decoded = [_decode_image(image_bytes) for image_bytes in images]
+        detections: List[Any] = [None] * len(images)
+
+        ready = [i for i, mat in enumerate(decoded) if mat is not None]
+        if ready:
+            for i, found in zip(ready, self._run_detector([decoded[i] for i in ready], batch_size)):
+                detections[i] = found
+
+        undecoded = [i for i, mat in enumerate(decoded) if mat is None]
+        if undecoded:
+            for i, found in zip(undecoded, self._detect_from_files([images[i] for i in undecoded], batch_size)):
+                detections[i] = found
+
+        return detections
+
+    def _detect_from_files(self, images: List[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+        """Run NudeNet over in-memory images by way of temp files."""
+        tmp_paths = []
         try:
-            detections = self._detector.detect(tmp_path)
-
-            # NudeDetector.detect() returns a list of detections
-            # Each detection: {'class': str, 'score': float, 'box': [x, y, w, h]}
-            if not detections:
-                logger.debug(f"NudeNet detected safe from bytes (no detections)")
-                return False
-
-            # Check for NSFW classes
-            nsfw_classes = [
-                "FEMALE_GENITALIA_COVERED",  # Treat covered as potentially NSFW too
-                "BUTTOCKS_EXPOSED",
-                "FEMALE_BREAST_EXPOSED",
-                "FEMALE_GENITALIA_EXPOSED",
-                "MALE_BREAST_EXPOSED",
-                "ANUS_EXPOSED",
-                "BELLY_EXPOSED",
-                "MALE_GENITALIA_EXPOSED",
-                "ARMPITS_EXPOSED",
-            ]
-
-            max_score = 0.0
-            detected_nsfw = False
-
-            for detection in detections:
-                class_name = detection.get('class', '')
-                score = detection.get('score', 0.0)
-
-                if class_name in nsfw_classes:
-                    detected_nsfw = True
-                    max_score = max(max_score, score)
-                    logger.debug(f"NudeNet detected NSFW class from bytes: {class_name} (score={score:.3f})")
-
-            if detected_nsfw and max_score > self.threshold:
-                logger.debug(f"NudeNet detected NSFW from bytes (max_score={max_score:.3f} > threshold={self.threshold})")
-                return True
+            for image_bytes in images:
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg", dir=_TEMP_DIR) as tmp_file:
+                    tmp_file.write(image_bytes)
+                    tmp_paths.append(tmp_file.name)
 
-            logger.debug(f"NudeNet detected safe from bytes (max_score={max_score:.3f})")
-            return False
+            return self._run_detector(tmp_paths, batch_size)
         finally:
-            # Clean up temp file
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+            # Clean up temp files
+            for tmp_path in tmp_paths:
+                try:
+                    os.unlink(tmp_path)
+                except:
+                    pass
+
+    def _run_detector(self, images: List[Any], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+        """Run NudeNet over image paths or decoded arrays, in batches of batch_size when supported."""
+        detect_batch = getattr(self._detector, "detect_batch", None)
+        if detect_batch and len(images) > 1:
+            return detect_batch(images, batch_size=batch_size)
+        return [self._detector.detect(image) for image in images]
+
+    def is_nsfw_batch(self, image_paths: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[bool]:
+        """
+        Check several image files, running the model over them in batches.
+
+        Args:
+            image_paths: Paths to the image files
+            batch_size: Number of images per forward pass
+
+        Returns:
+            List of NSFW flags, one per input path (False only for the missing or unreadable images)
+        """
+        verdicts = [False] * len(image_paths)
+        present = [i for i, image_path in enumerate(image_paths) if Path(image_path).exists()]
+        if len(present) < len(image_paths):
+            logger.warning(f"{len(image_paths) - len(present)} of {len(image_paths)} images not found")
+        if not present:
+            return verdicts
+
+        try:
+            batch_detections = self._run_detector([image_paths[i] for i in present], batch_size)
+        except Exception as e:
+            # One unreadable image fails the whole batch; recheck individually so only it fails open
+            logger.warning(f"Batch of {len(present)} images failed ({e}), checking them one at a time")
+            for i in present:
+                verdicts[i] = self.is_nsfw(image_paths[i])
+            return verdicts
+
+        for i, detections in zip(present, batch_detections):
+            verdicts[i] = self._evaluate_detections(detections, image_paths[i])
+        return verdicts
+
+    def is_nsfw_many(self, image_paths: Iterable[str], workers: int = 4) -> Iterator[bool]:
+        """
+        Check many image files on a pool of worker threads.
+
+        ONNX Runtime releases the GIL during inference, so workers overlap
+        one image's decode with another's forward pass.
+
+        Args:
+            image_paths: Paths to the image files
+            workers: Number of worker threads
+
+        Returns:
+            Iterator of NSFW flags, in input order
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(self.is_nsfw, image_paths)
+
+    def is_nsfw_from_bytes_batch(self, images: List[bytes], batch_size: int = DEFAULT_BATCH_SIZE) -> List[bool]:
+        """
+        Check several in-memory images, running the model over them in batches.
+
+        Uses NudeDetector.detect_batch when the installed NudeNet provides it.
+        Images already checked by this detector are answered from its verdict cache.
+
+        Args:
+            images: List of image data as bytes
+            batch_size: Number of images per forward pass
+
+        Returns:
+            List of NSFW flags, one per input image (False only for the images that could not be checked)
+        """
+        if not images:
+            return []
+
+        keys = [_content_key(image_bytes) for image_bytes in images]
+        verdicts = [self._cached_verdict(key) for key in keys]
+        misses = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if not misses:
+            return verdicts
+
+        try:
+            batch_detections = self._detect_from_bytes([images[i] for i in misses], batch_size)
+        except Exception as e:
+            # One undecodable image fails the whole batch; recheck individually so only it fails open
+            logger.warning(f"Batch of {len(misses)} images failed ({e}), checking them one at a time")
+            for i in misses:
+                verdicts[i] = self.is_nsfw_from_bytes(images[i])
+            return verdicts
+
+        for i, detections in zip(misses, batch_detections):
+            verdicts[i] = self._evaluate_detections(detections, f"batch image {i}")
+            self._remember_verdict(keys[i], verdicts[i])
+        return verdicts
 
     def get_backend_name(self) -> str:
         """Get the name of the current backend."""
@@ -197,6 +455,33 @@ class NSFWDetector:
         }
 
 
+def _content_key(image_bytes: bytes) -> bytes:
+    """Hash image bytes into a compact verdict-cache key."""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+
+# Detectors created so far, keyed by threshold (loading the model is the expensive part)
+_DETECTORS: Dict[float, NSFWDetector] = {}
+_DETECTORS_LOCK = threading.Lock()
+
+
+def get_detector(threshold: float = 0.7) -> NSFWDetector:
+    """
+    Get a shared NSFW detector, loading the model on first use.
+
+    Args:
+        threshold: NSFW threshold (0.0-1.0)
+
+    Returns:
+        Detector reused by every caller asking for the same threshold (all share one model)
+    """
+    # Callers on the event loop and on executor threads may race to create the first detector
+    with _DETECTORS_LOCK:
+        if threshold not in _DETECTORS:
+            _DETECTORS[threshold] = NSFWDetector(threshold=threshold)
+        return _DETECTORS[threshold]
+
+
 # Convenience function for quick checks
 def is_image_nsfw(image_path: str, threshold: float = 0.7) -> bool:
     """
@@ -209,8 +494,68 @@ def is_image_nsfw(image_path: str, threshold: float = 0.7) -> bool:
     Returns:
         True if NSFW, False otherwise
     """
-    detector = NSFWDetector(threshold=threshold)
-    return detector.is_nsfw(image_path)
+    return get_detector(threshold).is_nsfw(image_path)
+
+
+def filter_directory(
+    directory: Path,
+    threshold: float = 0.7,
+    workers: int = 4,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    delete: bool = False
+) -> List[Path]:
+    """
+    Find NSFW images under a directory, such as a finished scrape's output folder.
+
+    Files are read on a thread pool while the previous batch is being
+    classified, so disk reads overlap with inference.
+
+    Args:
+        directory: Folder to search recursively for images
+        threshold: NSFW threshold (0.0-1.0)
+        workers: Number of threads reading files
+        batch_size: Number of images per forward pass
+        delete: Delete the NSFW images once all batches are classified
+
+    Returns:
+        Paths of the images found to be NSFW
+    """
+    detector = get_detector(threshold)
+    image_paths = sorted(
+        path for path in Path(directory).rglob("*")
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file()
+    )
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    logger.info(f"Checking {len(image_paths)} images under {directory}")
+
+    nsfw_paths = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def read_batch(batch):
+            return [executor.submit(path.read_bytes) for path in batch]
+
+        pending = read_batch(batches[0]) if batches else []
+        for i, batch in enumerate(batches):
+            readable_paths, contents = [], []
+            for path, future in zip(batch, pending):
+                try:
+                    contents.append(future.result())
+                    readable_paths.append(path)
+                except OSError as e:
+                    logger.warning(f"Could not read {path}: {e}")
+
+            # Start reading the next batch before classifying this one
+            pending = read_batch(batches[i + 1]) if i + 1 < len(batches) else []
+
+            verdicts = detector.is_nsfw_from_bytes_batch(contents, batch_size)
+            nsfw_paths.extend(path for path, is_nsfw in zip(readable_paths, verdicts) if is_nsfw)
+
+    logger.info(f"Found {len(nsfw_paths)}/{len(image_paths)} NSFW images under {directory}")
+
+    if delete:
+        for path in nsfw_paths:
+            path.unlink(missing_ok=True)
+
+    return nsfw_paths
 
 
 if __name__ == "__main__":
@@ -218,12 +563,18 @@ if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: python nsfw_filter.py <image_path> [threshold]")
+        print("Usage: python nsfw_filter.py <image_path|directory> [threshold]")
         sys.exit(1)
 
     image_path = sys.argv[1]
     threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.7
 
+    if Path(image_path).is_dir():
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        for nsfw_path in filter_directory(Path(image_path), threshold=threshold):
+            print(f"NSFW: {nsfw_path}")
+        sys.exit(0)
+
     print(f"Checking: {image_path}")
     print(f"Threshold: {threshold}")
     print("-" * 40)
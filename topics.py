@@ -3,6 +3,10 @@ Pinterest topics organized by category.
 All topics from the user's requirements.
 """
 
+import sys
+from itertools import accumulate
+from types import MappingProxyType
+
 PINTEREST_TOPICS = {
     "STUDY_ACADEMIA": [
         "dark academia", "light academia", "chaotic academia", "studytok", "study motivation",
@@ -209,35 +213,69 @@ PINTEREST_TOPICS = {
     ],
 }
 
-# Get all topics as a flat list
+# Freeze the table: the flat arrays below are derived from it once and must not go stale.
+# Strings are interned so a topic listed under several categories is stored once, and
+# equal topics compare by identity first.
+PINTEREST_TOPICS = MappingProxyType({
+    sys.intern(category): tuple(sys.intern(topic) for topic in topics)
+    for category, topics in PINTEREST_TOPICS.items()
+})
+
+# Flat parallel arrays of every topic and its category, built once at import
+_ALL_TOPICS = tuple(topic for topics in PINTEREST_TOPICS.values() for topic in topics)
+_ALL_CATEGORIES = tuple(category for category, topics in PINTEREST_TOPICS.items() for _ in topics)
+
+_TOPIC_COUNT = len(_ALL_TOPICS)
+
+# Every (category, topic) pair, in category order
+_ALL_TOPIC_PAIRS = tuple(zip(_ALL_CATEGORIES, _ALL_TOPICS))
+
+# Each category's (start, end) slice into the flat arrays
+_CAT_SPANS = {
+    category: (end - len(topics), end)
+    for (category, topics), end in zip(
+        PINTEREST_TOPICS.items(), accumulate(len(topics) for topics in PINTEREST_TOPICS.values())
+    )
+}
+
+# Get all topics as a flat tuple
 def get_all_topics():
-    """Return all topics as a flat list of (category, topic) tuples."""
-    all_topics = []
-    for category, topics in PINTEREST_TOPICS.items():
-        for topic in topics:
-            all_topics.append((category, topic))
-    return all_topics
+    """Return all topics as a flat tuple of (category, topic) tuples, shared between calls."""
+    return _ALL_TOPIC_PAIRS
+
+# Index-based access to the flat topic arrays
+def get_all_topic_indices():
+    """Return the indices of all topics, for use with topic_at() and category_at()."""
+    return range(_TOPIC_COUNT)
+
+def topic_at(index):
+    """Return the topic at a flat index."""
+    return _ALL_TOPICS[index]
+
+def category_at(index):
+    """Return the category of the topic at a flat index."""
+    return _ALL_CATEGORIES[index]
 
 # Get topics for specific categories
 def get_topics_for_categories(categories):
     """
-    Return topics for specific categories.
-    categories: list of category names (e.g., ["STUDY_ACADEMIA", "FOOD_COOKING"])
+    Return topics for specific categories, in PINTEREST_TOPICS order.
+    categories: iterable of category names (e.g., ["STUDY_ACADEMIA", "FOOD_COOKING"])
     """
+    if not isinstance(categories, (set, frozenset)):
+        categories = frozenset(categories)
     result = []
-    for category in categories:
-        if category in PINTEREST_TOPICS:
-            for topic in PINTEREST_TOPICS[category]:
-                result.append((category, topic))
+    for category, (start, end) in _CAT_SPANS.items():
+        if category in categories:
+            result.extend(_ALL_TOPIC_PAIRS[start:end])
     return result
 
 # Get total topic count
 def get_topic_count():
     """Return total number of topics across all categories."""
-    return sum(len(topics) for topics in PINTEREST_TOPICS.values())
+    return _TOPIC_COUNT
 
 if __name__ == "__main__":
     print(f"Total categories: {len(PINTEREST_TOPICS)}")
     print(f"Total topics: {get_topic_count()}")
-    for category, topics in PINTEREST_TOPICS.items():
-        print(f"{category}: {len(topics)} topics")
+    sys.stdout.write("\n".join(f"{category}: {len(topics)} topics" for category, topics in PINTEREST_TOPICS.items()) + "\n")